@@ -0,0 +1,63 @@
+import sys
+import logging
+import argparse
+import importlib.metadata
+
+from . import _python
+
+
+class _VersionAction(argparse.Action):
+    """Like action="version", but only resolves the package version when
+    --version is actually used. importlib.metadata re-reads the on-disk
+    distribution metadata on every call, which is a startup tax for every
+    other invocation.
+    """
+
+    def __init__(self, option_strings, dest, **kwargs):
+        super().__init__(option_strings, dest, nargs=0, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        # Print to stdout like argparse's own version action; parser.exit
+        # with a message would write to stderr.
+        print(importlib.metadata.version(__package__))
+        parser.exit()
+
+
+def parseArgs(args: list[str]) -> tuple[argparse.ArgumentParser, argparse.Namespace]:
+    parser = argparse.ArgumentParser(
+        prog=__package__,
+        description="Bootstrap rez with a standalone python interpreter",
+    )
+    parser.add_argument(
+        "--version",
+        action=_VersionAction,
+        help="show program's version number and exit",
+    )
+
+    # add_subparsers can only be called once per parser.
+    subparsers = parser.add_subparsers(title="commands", dest="command")
+
+    modules = [_python]
+    for module in modules:
+        name = module.__name__.rsplit("._", 1)[-1]
+        subparser = subparsers.add_parser(name, help=module.__doc__)
+        module.setupParser(subparser)
+        subparser.set_defaults(func=module.run)
+
+    return parser, parser.parse_args(args)
+
+
+def run() -> int:
+    rootLogger = logging.getLogger(__package__)
+    rootLogger.setLevel(logging.INFO)
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+    rootLogger.addHandler(handler)
+
+    parser, args = parseArgs(sys.argv[1:])
+    if not hasattr(args, "func"):
+        parser.print_help()
+        return 1
+
+    return args.func(args)
@@ -0,0 +1,460 @@
+"""Manage standalone python interpreters."""
+import os
+import re
+import time
+import logging
+import typing
+import hashlib
+import pathlib
+import argparse
+import threading
+import dataclasses
+import concurrent.futures
+
+if typing.TYPE_CHECKING:
+    import requests
+
+_LOG = logging.getLogger(__name__)
+
+# One ZstdDecompressor per download thread; the decompression context is
+# reusable across calls but not thread-safe.
+_TLS = threading.local()
+
+INSTALL_ONLY_REGEX = r"^(?P<implementation>[a-z]+)-(?P<pythonVersion>[0-9.]+)\+(?P<ghRelease>[0-9]+)-(?P<triplet>(?:-?[a-zA-Z0-9_])+)-install_only\.tar\.gz$"
+FULL_REGEX = r"^(?P<implementation>[a-z]+)-(?P<pythonVersion>[0-9.]+)\+(?P<ghRelease>[0-9]+)-(?P<triplet>(?:-?[a-zA-Z0-9_])+)-(?P<config>debug|noopt|lto|pgo\+lto|pgo)-full\.tar\.zst$"
+
+
+def _readTarMember(reader: typing.BinaryIO, memberName: str) -> typing.Optional[bytes]:
+    """Read one member out of a sequential uncompressed tar stream.
+
+    tarfile constructs a TarInfo for every member it skips, which adds up
+    on full builds with thousands of files. This only decodes the name
+    and size fields of each 512-byte header and discards bodies in large
+    reads, stopping as soon as the wanted member has been read. Plain
+    member names only, which is all we need for python/PYTHON.json.
+    """
+    target = memberName.encode()
+
+    while True:
+        header = reader.read(512)
+        if len(header) < 512 or header.count(b"\0") == 512:
+            # Truncated stream or the empty block marking the end.
+            return None
+
+        name = header[:100].split(b"\0", 1)[0]
+        if name.startswith(b"./"):
+            name = name[2:]
+
+        size = int(header[124:136].rstrip(b" \0") or b"0", 8)
+
+        # '0' or NUL typeflag means a regular file.
+        if name == target and header[156:157] in (b"0", b"\0"):
+            data = reader.read(size)
+            return data if len(data) == size else None
+
+        # Skip the body, padded to full 512-byte blocks.
+        remaining = (size + 511) & ~511
+        while remaining:
+            chunk = reader.read(min(remaining, 1 << 20))
+            if not chunk:
+                return None
+            remaining -= len(chunk)
+
+
+_SESSION: typing.Optional["requests.Session"] = None
+
+# (connect, read) timeout for every request, so a stalled connection
+# can't hang the CLI (or hold a download thread) indefinitely.
+_TIMEOUT = (5, 30)
+
+
+def _getSession() -> "requests.Session":
+    """Session shared by the API fetch and all tarball downloads so that
+    keep-alive connections are reused instead of paying a TCP + TLS
+    handshake per request. Session.get is thread-safe, so the threads in
+    _generateVariants can all use it.
+
+    Created on first use so that importing this module doesn't pull in
+    requests.
+    """
+    global _SESSION
+    if _SESSION is None:
+        import requests
+        import requests.adapters
+
+        _SESSION = requests.Session()
+        _SESSION.mount(
+            "https://",
+            requests.adapters.HTTPAdapter(
+                pool_connections=32,
+                pool_maxsize=32,
+                max_retries=requests.adapters.Retry(
+                    total=3,
+                    backoff_factor=0.5,
+                    status_forcelist=(502, 503, 504),
+                    allowed_methods=("GET",),
+                ),
+            ),
+        )
+
+    return _SESSION
+
+
+# How long the cached GitHub releases listing stays fresh. Within the
+# TTL we don't even hit the network; past it we revalidate with the
+# stored ETag so the common case is a bodyless 304.
+_RELEASES_CACHE_TTL = 600
+
+
+def _cacheDir() -> pathlib.Path:
+    import platformdirs
+
+    path = pathlib.Path(platformdirs.user_cache_dir("rez-bootstrap"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+# Asset names are ASCII only, so compile once with re.ASCII to avoid
+# re-consulting the re cache for every asset.
+INSTALL_ONLY_RE = re.compile(INSTALL_ONLY_REGEX, re.ASCII)
+FULL_RE = re.compile(FULL_REGEX, re.ASCII)
+
+_CONFIGS = frozenset(("debug", "noopt", "lto", "pgo", "pgo+lto"))
+
+
+def _parseAssetRegex(name: str) -> typing.Optional[dict]:
+    match = INSTALL_ONLY_RE.match(name)
+    if match:
+        return {"kind": "install_only", "config": None, **match.groupdict()}
+
+    match = FULL_RE.match(name)
+    if match:
+        return {"kind": "full", **match.groupdict()}
+
+    return None
+
+
+def _parseAsset(name: str) -> typing.Optional[dict]:
+    """Parse a python-build-standalone asset name.
+
+    Asset names use fixed delimiters, so a split-based parse is much
+    cheaper than running both regexes on every asset. Anything the fast
+    path doesn't recognize falls back to the regexes. Returns the regex
+    groupdict keys plus "kind" ("install_only" or "full"), or None for
+    names that are not python distributions.
+    """
+    if name.endswith("-install_only.tar.gz"):
+        kind = "install_only"
+        config = None
+        stem = name[: -len("-install_only.tar.gz")]
+    elif name.endswith("-full.tar.zst"):
+        kind = "full"
+        stem, _, config = name[: -len("-full.tar.zst")].rpartition("-")
+        if config not in _CONFIGS:
+            return _parseAssetRegex(name)
+    else:
+        return _parseAssetRegex(name)
+
+    head, plus, tail = stem.partition("+")
+    implementation, dash1, pythonVersion = head.partition("-")
+    ghRelease, dash2, triplet = tail.partition("-")
+
+    if not (plus and dash1 and dash2):
+        return _parseAssetRegex(name)
+    if not (implementation.isalpha() and implementation.islower()):
+        return _parseAssetRegex(name)
+    if not pythonVersion.replace(".", "").isdigit() or not ghRelease.isdigit():
+        return _parseAssetRegex(name)
+
+    # Same as the (?:-?[a-zA-Z0-9_])+ triplet group in the regexes:
+    # non-empty, ASCII alnum/underscore tokens separated by single dashes.
+    tripletChars = triplet.replace("-", "").replace("_", "")
+    if not tripletChars.isascii() or not tripletChars.isalnum():
+        return _parseAssetRegex(name)
+    if "--" in triplet or triplet.endswith("-"):
+        return _parseAssetRegex(name)
+
+    return {
+        "kind": kind,
+        "implementation": implementation,
+        "pythonVersion": pythonVersion,
+        "ghRelease": ghRelease,
+        "triplet": triplet,
+        "config": config,
+    }
+
+
+@dataclasses.dataclass(slots=True)
+class Variant:
+    name: str
+    url: str
+    implementation: str
+    pythonVersion: str
+    ghRelease: str
+    triplet: str
+    config: typing.Optional[str] = None
+    buildInfo: dict = dataclasses.field(default_factory=dict)
+    _cruntime: typing.Optional[str] = dataclasses.field(
+        default=None, init=False, repr=False
+    )
+
+    @property
+    def cruntime(self) -> typing.Optional[str]:
+        """C runtime against which the interpreter was built.
+
+        Computed once when buildInfo is assigned rather than re-parsing
+        crt_features on every access.
+        """
+        return self._cruntime
+
+    def _computeCruntime(self) -> typing.Optional[str]:
+        features = [feature.split(":") for feature in self.buildInfo.get("crt_features", [])]
+
+        match = next(
+            (feature for feature in features if feature[0] == "glibc-max-symbol-version"),
+            None,
+        )
+        if match:
+            return f"glibc-{match[1]}"
+
+        match = next(
+            (feature for feature in features if feature[0] == "vcruntime"), None
+        )
+        if match:
+            return f"vcruntime-{match[1]}"
+
+        return None
+
+
+def getInfo(
+    item: tuple[Variant, typing.Optional[str]]
+) -> tuple[dict, Variant]:
+    """Get the PYTHON.json build information for a full build variant.
+
+    Prefer the JSON sidecar asset when the release publishes one, since it
+    contains the same data as PYTHON.json. Only fall back to downloading
+    the full build and extracting PYTHON.json from the tarball.
+    """
+    import orjson
+    import zstandard
+
+    bestMatch, sidecarUrl = item
+
+    # Release assets are immutable once published, so the extracted JSON
+    # can be cached forever, keyed by download URL.
+    cachePath = _cacheDir() / f"{hashlib.sha1(bestMatch.url.encode()).hexdigest()}.json"
+    if cachePath.is_file():
+        return orjson.loads(cachePath.read_bytes()), bestMatch
+
+    if sidecarUrl is not None:
+        response = _getSession().get(sidecarUrl, timeout=_TIMEOUT)
+        response.raise_for_status()
+        info = orjson.loads(response.content)
+        cachePath.write_bytes(response.content)
+        return info, bestMatch
+
+    response = _getSession().get(bestMatch.url, stream=True, timeout=_TIMEOUT)
+    response.raise_for_status()
+
+    info = {}
+    dctx = getattr(_TLS, "dctx", None)
+    if dctx is None:
+        dctx = _TLS.dctx = zstandard.ZstdDecompressor(max_window_size=2**27)
+    reader = dctx.stream_reader(response.raw, read_size=1 << 20)
+    try:
+        data = _readTarMember(reader, "python/PYTHON.json")
+        if data is not None:
+            info = orjson.loads(data)
+    finally:
+        # Stop the TCP receive as soon as we have what we need instead of
+        # draining the rest of a multi-hundred-MB tarball.
+        reader.close()
+        response.close()
+
+    if info:
+        cachePath.write_bytes(orjson.dumps(info))
+
+    return info, bestMatch
+
+
+class Interpreters:
+    """Available python interpreters from python-build-standalone."""
+
+    def __init__(self, maxWorkers: typing.Optional[int] = None):
+        # The downloads in _generateVariants are network bound, so allow
+        # more threads than the ThreadPoolExecutor default would.
+        self._maxWorkers = maxWorkers or min(32, (os.cpu_count() or 4) * 5)
+
+        self._data = self._getLatestRelease()
+        self._variants: typing.Optional[list[Variant]] = None
+
+    def _getLatestRelease(self) -> dict:
+        import orjson
+
+        cachePath = _cacheDir() / "releases-latest.json"
+        etagPath = cachePath.with_suffix(".etag")
+
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+        }
+
+        if cachePath.is_file():
+            if time.time() - cachePath.stat().st_mtime < _RELEASES_CACHE_TTL:
+                return orjson.loads(cachePath.read_bytes())
+            if etagPath.is_file():
+                headers["If-None-Match"] = etagPath.read_text().strip()
+
+        response = _getSession().get(
+            "https://api.github.com/repos/indygreg/python-build-standalone/releases/latest",
+            headers=headers,
+            timeout=_TIMEOUT,
+        )
+        response.raise_for_status()
+
+        if response.status_code == 304:
+            cachePath.touch()
+            return orjson.loads(cachePath.read_bytes())
+
+        cachePath.write_bytes(response.content)
+        if "ETag" in response.headers:
+            etagPath.write_text(response.headers["ETag"])
+
+        return orjson.loads(response.content)
+
+    @property
+    def variants(self) -> list[Variant]:
+        if self._variants is None:
+            self._variants = self._generateVariants()
+        return self._variants
+
+    def _generateVariants(self) -> list[Variant]:
+        variants = []
+        groups: dict[tuple[str, str, str], list[Variant]] = {}
+        assetUrls = {
+            asset["name"]: asset["browser_download_url"]
+            for asset in self._data["assets"]
+        }
+
+        for asset in self._data["assets"]:
+            name = asset["name"]
+
+            values = _parseAsset(name)
+            if values is None:
+                _LOG.debug("%r is not a recognized python distribution", name)
+                continue
+
+            variant = Variant(
+                name=name,
+                url=asset["browser_download_url"],
+                implementation=values["implementation"],
+                pythonVersion=values["pythonVersion"],
+                ghRelease=values["ghRelease"],
+                triplet=values["triplet"],
+                config=values["config"],
+            )
+
+            if values["kind"] == "install_only":
+                variants.append(variant)
+                continue
+
+            _LOG.debug("Found full build %r with config %s", name, values["config"])
+            key = (variant.implementation, variant.pythonVersion, variant.triplet)
+            groups.setdefault(key, []).append(variant)
+
+        # Prefer the most optimized build when multiple configs exist
+        # for the same python version and platform.
+        order = {"pgo+lto": 0, "pgo": 1, "lto": 2, "noopt": 3, "debug": 4}
+
+        # We only need the minimum of each group, no point in sorting, and
+        # computing it once per group avoids redoing it for every variant
+        # that shares the key.
+        orderGet = order.get
+        bestByKey = {
+            key: min(group, key=lambda x: orderGet(x.config, 99))
+            for key, group in groups.items()
+        }
+
+        # Multiple install_only variants can resolve to the same full
+        # tarball, so only download each unique URL once and fan the
+        # result out to every variant in the bucket.
+        itemsToProcess = []
+        buckets: dict[str, list[Variant]] = {}
+        for variant in variants:
+            key = (variant.implementation, variant.pythonVersion, variant.triplet)
+            bestMatch = bestByKey.get(key)
+            if bestMatch is None:
+                continue
+
+            if bestMatch.url not in buckets:
+                buckets[bestMatch.url] = []
+                itemsToProcess.append(
+                    (bestMatch, assetUrls.get(bestMatch.name + ".json"))
+                )
+            buckets[bestMatch.url].append(variant)
+
+        import rich.progress
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._maxWorkers, thread_name_prefix="variant-fetch"
+        ) as threadPool:
+            futures = [threadPool.submit(getInfo, item) for item in itemsToProcess]
+
+            # as_completed processes results as soon as they arrive
+            # instead of blocking in submission order like map does.
+            with rich.progress.Progress(transient=True) as progress:
+                task = progress.add_task("Fetching build info", total=len(futures))
+                for future in concurrent.futures.as_completed(futures):
+                    info, bestMatch = future.result()
+                    for installOnly in buckets[bestMatch.url]:
+                        installOnly.buildInfo = info
+                        installOnly.config = bestMatch.config
+                        installOnly._cruntime = installOnly._computeCruntime()
+                    progress.advance(task)
+
+        return variants
+
+
+def setupParser(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--list-available-versions",
+        action="store_true",
+        help="List available python versions",
+    )
+    parser.add_argument(
+        "--max-parallel-downloads",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Maximum number of parallel downloads",
+    )
+
+
+def run(args: argparse.Namespace) -> int:
+    if args.list_available_versions:
+        # rich pulls in a large import graph, keep it off the cold path.
+        import rich
+        import rich.table
+
+        interpreters = Interpreters(maxWorkers=args.max_parallel_downloads)
+
+        table = rich.table.Table(
+            "Implementation",
+            "Version",
+            "Triplet",
+            "Config",
+            "C Runtime",
+            title="Available python versions",
+        )
+        for variant in interpreters.variants:
+            table.add_row(
+                variant.implementation,
+                variant.pythonVersion,
+                variant.triplet,
+                variant.config,
+                variant.cruntime,
+            )
+
+        rich.print(table)
+
+    return 0